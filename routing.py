@@ -1,15 +1,32 @@
+import functools
+import hashlib
+import json
 import math
 import os
+from pathlib import Path
+
 import folium
-import geojson
 import numpy as np
 import openrouteservice
-from shapely.geometry import LineString, Point
+from shapely.geometry import LineString
 from dotenv import load_dotenv
 
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ROUTE_CACHE_DIR = Path(".route_cache")  # Cached ORS directions responses
 
+
+@functools.lru_cache(maxsize=1)
 def load_api_key():
-    """Load the OpenRouteService API key from environment variables."""
+    """Load the OpenRouteService API key from environment variables (read once)."""
     load_dotenv()
     api_key = os.getenv("OPEN_ROUTE_SERVICE_API_KEY")
     if not api_key:
@@ -17,6 +34,12 @@ def load_api_key():
     return api_key
 
 
+@functools.lru_cache(maxsize=1)
+def get_client():
+    """Return a shared OpenRouteService client so its HTTP session is reused."""
+    return openrouteservice.Client(key=load_api_key())
+
+
 def get_directions(client, coords, profile="foot-walking"):
     """
     Fetch directions between two points using OpenRouteService.
@@ -29,9 +52,31 @@ def get_directions(client, coords, profile="foot-walking"):
     Returns:
         dict: GeoJSON result from the OpenRouteService directions API.
     """
-    return client.directions(
-        coordinates=coords, profile=profile, format="geojson", geometry=True, units="m"
+    # Hashable key so repeat routes skip the network call entirely
+    coords_key = tuple(tuple(c) for c in coords)
+    return _get_directions_cached(client, coords_key, profile)
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_directions_cached(client, coords_key, profile):
+    """Fetch directions with an in-memory LRU and a persistent file cache."""
+    key = hashlib.sha1(f"{coords_key},{profile}".encode()).hexdigest()
+    cache_file = ROUTE_CACHE_DIR / f"{key}.geojson"
+    if cache_file.exists():
+        with open(cache_file) as f:
+            return json.load(f)
+
+    result = client.directions(
+        coordinates=[list(c) for c in coords_key],
+        profile=profile,
+        format="geojson",
+        geometry=True,
+        units="m",
     )
+    ROUTE_CACHE_DIR.mkdir(exist_ok=True)
+    with open(cache_file, "w") as f:
+        json.dump(result, f)
+    return result
 
 
 def calculate_heading(point1, point2):
@@ -59,6 +104,41 @@ def calculate_heading(point1, point2):
     return int(round(compass_bearing)) if round(compass_bearing) > 0 else 360
 
 
+def _compass_bearings_numpy(lon, lat):
+    """Compass bearings (degrees) between consecutive points, in radians arrays."""
+    # Consecutive segments share an endpoint, so evaluate sin/cos per
+    # latitude once and slice, instead of twice per segment
+    d_lon = lon[1:] - lon[:-1]
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    cos_d_lon = np.cos(d_lon)
+    x = np.sin(d_lon) * cos_lat[1:]
+    y = cos_lat[:-1] * sin_lat[1:] - sin_lat[:-1] * cos_lat[1:] * cos_d_lon
+    return np.mod(np.degrees(np.arctan2(x, y)), 360.0)
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _bearing_kernel(lon, lat, out):  # pragma: no cover - exercised when numba is installed
+        for i in prange(out.shape[0]):
+            d_lon = lon[i + 1] - lon[i]
+            x = math.sin(d_lon) * math.cos(lat[i + 1])
+            y = (
+                math.cos(lat[i]) * math.sin(lat[i + 1])
+                - math.sin(lat[i]) * math.cos(lat[i + 1]) * math.cos(d_lon)
+            )
+            out[i] = math.degrees(math.atan2(x, y)) % 360.0
+
+
+def _compass_bearings(lon, lat):
+    """Dispatch bearing computation to the numba kernel when available."""
+    if njit is not None:
+        out = np.empty(lon.shape[0] - 1)
+        _bearing_kernel(lon, lat, out)
+        return out
+    return _compass_bearings_numpy(lon, lat)
+
+
 def interpolate_points(line, num_points=100):
     """
     Interpolate evenly spaced points along a LineString.
@@ -68,41 +148,109 @@ def interpolate_points(line, num_points=100):
         num_points (int): Number of points to interpolate.
 
     Returns:
-        list: List of Shapely Point objects representing interpolated points.
+        tuple: (lon, lat) float64 ndarrays of the interpolated coordinates.
     """
-    spacing_distance = line.length / num_points
-    distances_on_line = np.arange(0, 1, spacing_distance / line.length)
-    return [line.interpolate(distance, normalized=True) for distance in distances_on_line]
+    coords = np.asarray(line.coords)
+    segments = np.diff(coords, axis=0)
+    segment_lengths = np.hypot(segments[:, 0], segments[:, 1])
+    cumulative = np.concatenate([[0], np.cumsum(segment_lengths)])
+
+    # Interpolate x and y along the cumulative arc length in one pass
+    distances = np.linspace(0, cumulative[-1], num_points, endpoint=False)
+    lon = np.interp(distances, cumulative, coords[:, 0])
+    lat = np.interp(distances, cumulative, coords[:, 1])
+    return lon, lat
 
 
-def calculate_headings(spaced_points):
+def _round_headings(compass_bearings):
+    """Round float bearings to integer headings in 1..360."""
+    rounded = np.rint(compass_bearings).astype(np.int32)
+    return np.where(rounded == 0, np.int32(360), rounded)
+
+
+def interpolate_with_headings(line, num_points=100):
     """
-    Calculate heading directions for a list of evenly spaced points.
+    Interpolate evenly spaced points along a LineString with their headings.
+
+    The heading is constant along each segment of the original line, so
+    bearings are computed once for the M-1 source segments and assigned to
+    interpolated points by binary search on the cumulative arc length,
+    instead of re-deriving them from consecutive interpolated points.
 
     Args:
-        spaced_points (list): List of Shapely Point objects.
+        line (LineString): Shapely LineString geometry.
+        num_points (int): Number of points to interpolate.
 
     Returns:
-        list: List of dictionaries with point coordinates and heading.
+        tuple: (lon, lat, headings) where lon/lat are float64 ndarrays of
+            length num_points and headings is an int32 ndarray of length
+            num_points - 1 (the final point has no heading).
     """
-    heading_data = [
+    coords = np.asarray(line.coords)
+    segments = np.diff(coords, axis=0)
+    segment_lengths = np.hypot(segments[:, 0], segments[:, 1])
+    cumulative = np.concatenate([[0], np.cumsum(segment_lengths)])
+
+    distances = np.linspace(0, cumulative[-1], num_points, endpoint=False)
+    lon = np.interp(distances, cumulative, coords[:, 0])
+    lat = np.interp(distances, cumulative, coords[:, 1])
+
+    # One bearing per source segment (usually far fewer than num_points)
+    seg_headings = _round_headings(
+        _compass_bearings(np.radians(coords[:, 0]), np.radians(coords[:, 1]))
+    )
+    segment_index = np.searchsorted(cumulative, distances[:-1], side="right") - 1
+    headings = seg_headings[np.clip(segment_index, 0, len(seg_headings) - 1)]
+    return lon, lat, headings
+
+
+def calculate_headings(lon, lat):
+    """
+    Calculate heading directions for evenly spaced route coordinates.
+
+    Args:
+        lon (np.ndarray): Longitudes in degrees.
+        lat (np.ndarray): Latitudes in degrees.
+
+    Returns:
+        np.ndarray: Integer headings (1 to 360) between consecutive points,
+            of length len(lon) - 1 (the final point has no heading).
+    """
+    # Bearing between consecutive points, computed for all pairs at once
+    return _round_headings(_compass_bearings(np.radians(lon), np.radians(lat)))
+
+
+def build_heading_geojson(lon, lat, headings):
+    """
+    Assemble a GeoJSON FeatureCollection from route coordinate and heading arrays.
+
+    Args:
+        lon (np.ndarray): Longitudes in degrees.
+        lat (np.ndarray): Latitudes in degrees.
+        headings (np.ndarray): Integer headings for each consecutive pair.
+
+    Returns:
+        dict: GeoJSON FeatureCollection of Point features with heading properties.
+    """
+    # Plain dicts avoid constructing a shapely Point and a validated
+    # feature object per point
+    features = [
         {
-            "coordinates": [spaced_points[i].x, spaced_points[i].y],
-            "heading": calculate_heading(
-                (spaced_points[i].x, spaced_points[i].y),
-                (spaced_points[i + 1].x, spaced_points[i + 1].y),
-            ),
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [float(x), float(y)]},
+            "properties": {"heading": int(h)},
         }
-        for i in range(len(spaced_points) - 1)
+        for x, y, h in zip(lon[:-1], lat[:-1], headings)
     ]
-    # Add the last point with no heading
-    heading_data.append(
+    # The last point has no heading
+    features.append(
         {
-            "coordinates": [spaced_points[-1].x, spaced_points[-1].y],
-            "heading": None,
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [float(lon[-1]), float(lat[-1])]},
+            "properties": {"heading": None},
         }
     )
-    return heading_data
+    return {"type": "FeatureCollection", "features": features}
 
 
 def save_geojson(data, file_name):
@@ -110,15 +258,21 @@ def save_geojson(data, file_name):
     Save data to a GeoJSON file.
 
     Args:
-        data (dict or geojson.FeatureCollection): Data to save.
+        data (dict): GeoJSON-shaped dictionary to save.
         file_name (str): File name for saving the GeoJSON file.
     """
-    with open(file_name, "w") as f:
-        geojson.dump(data, f)
+    # orjson serializes the feature dicts (and any ndarrays) in native code;
+    # stdlib json is the fallback when it is not installed
+    if orjson is not None:
+        with open(file_name, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(file_name, "w") as f:
+            json.dump(data, f)
     print(f"GeoJSON saved to '{file_name}'")
 
 
-def create_map(start_location, end_location, directions_result, spaced_points, output_file):
+def create_map(start_location, end_location, directions_result, lon, lat, output_file):
     """
     Create a Folium map with the route and interpolated points.
 
@@ -126,7 +280,8 @@ def create_map(start_location, end_location, directions_result, spaced_points, o
         start_location (list): Starting location [latitude, longitude].
         end_location (list): Destination location [latitude, longitude].
         directions_result (dict): GeoJSON result of the route.
-        spaced_points (list): List of Shapely Point objects.
+        lon (np.ndarray): Longitudes of the interpolated points in degrees.
+        lat (np.ndarray): Latitudes of the interpolated points in degrees.
         output_file (str): File name for saving the map as HTML.
     """
     m = folium.Map(location=start_location, zoom_start=15)
@@ -134,9 +289,20 @@ def create_map(start_location, end_location, directions_result, spaced_points, o
     # Add the original LineString to the map
     folium.GeoJson(directions_result).add_to(m)
 
-    # Add markers for the interpolated points
-    for point in spaced_points:
-        folium.Marker(location=[point.y, point.x], tooltip="Interpolated Point").add_to(m)
+    # Add all interpolated points as one GeoJSON layer instead of one
+    # marker element per point
+    points_geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [float(x), float(y)]},
+                "properties": {},
+            }
+            for x, y in zip(lon, lat)
+        ],
+    }
+    folium.GeoJson(points_geojson, tooltip="Interpolated Point").add_to(m)
 
     # Add markers for the starting and destination locations
     folium.Marker(location=start_location, tooltip="Start").add_to(m)
@@ -148,32 +314,21 @@ def create_map(start_location, end_location, directions_result, spaced_points, o
 
 
 def main():
-    # Load API key
-    api_key = load_api_key()
-
-    # Define coordinates and initialize the client
+    # Define coordinates and get the shared client
     STARTING_LOCATION = [42.356280, -71.062290]  # [latitude, longitude]
     DESTINATION_LOCATION = [42.35155, -71.05818]  # [latitude, longitude]
     coords = [[-71.062290, 42.356280], [-71.05818, 42.35155]]  # [longitude, latitude]
-    client = openrouteservice.Client(key=api_key)
+    client = get_client()
 
     # Get directions
     directions_result = get_directions(client, coords)
 
-    # Extract the LineString and interpolate points
+    # Extract the LineString and interpolate points with their headings
     line = LineString(directions_result["features"][0]["geometry"]["coordinates"])
-    spaced_points = interpolate_points(line)
-
-    # Calculate headings for spaced points
-    spaced_points_heading = calculate_headings(spaced_points)
+    lon, lat, headings = interpolate_with_headings(line)
 
     # Save spaced points with headings as GeoJSON
-    heading_geojson = geojson.FeatureCollection([
-        geojson.Feature(
-            properties={"heading": hd["heading"]},
-            geometry=Point(hd["coordinates"])
-        ) for hd in spaced_points_heading
-    ])
+    heading_geojson = build_heading_geojson(lon, lat, headings)
     save_geojson(heading_geojson, "spaced_points_with_heading.geojson")
 
     # Create and save the map
@@ -181,7 +336,8 @@ def main():
         start_location=STARTING_LOCATION,
         end_location=DESTINATION_LOCATION,
         directions_result=directions_result,
-        spaced_points=spaced_points,
+        lon=lon,
+        lat=lat,
         output_file="route_with_interpolated_points.html"
     )
 
@@ -1,18 +1,100 @@
+import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from PIL import Image
 from io import BytesIO
 import numpy as np
 from routing import *
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbojpeg = TurboJPEG()
+except (ImportError, OSError):
+    _turbojpeg = None
+
 load_dotenv()
 API_KEY = os.getenv('MAPS_API')
+STREETVIEW_BASE_URL = "https://maps.googleapis.com/maps/api/streetview"
+MAX_FETCH_WORKERS = 16  # Concurrent Street View requests
+SV_CACHE_DIR = Path(".sv_cache")  # Cached Street View JPEGs, keyed by request params
+
+# Shared session: keeps connections to maps.googleapis.com alive so the
+# TCP/TLS handshake is paid once, not per image; retries transient errors
+_session = requests.Session()
+_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=MAX_FETCH_WORKERS,
+        pool_maxsize=MAX_FETCH_WORKERS,
+        max_retries=Retry(
+            total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]
+        ),
+    ),
+)
+
+
+def _decode_jpeg(img_bytes: bytes) -> np.ndarray:
+    """Decode JPEG bytes to an RGB array, using libjpeg-turbo's SIMD path when available."""
+    if _turbojpeg is not None:
+        return _turbojpeg.decode(img_bytes, pixel_format=TJPF_RGB)
+    return np.array(Image.open(BytesIO(img_bytes)))
+
+
+def _cache_path(lat: float, long: float, img_size: tuple, heading, pitch) -> Path:
+    """Return the on-disk cache location for one Street View request."""
+    key = hashlib.sha1(
+        f"{lat:.6f},{long:.6f},{heading},{pitch},{img_size[0]}x{img_size[1]}".encode()
+    ).hexdigest()
+    return SV_CACHE_DIR / key[:2] / f"{key}.jpg"
+
+
+def _build_streetview_url(lat: float, long: float, img_size: tuple, heading=None, pitch=None) -> str:
+    """Build the Street View request URL from the query parameters."""
+    # Single construction path; "is not None" keeps heading=0 / pitch=0 valid
+    params = {
+        "size": f"{img_size[0]}x{img_size[1]}",
+        "location": f"{lat},{long}",
+        "key": API_KEY,
+    }
+    if heading is not None:
+        params["heading"] = heading
+    if pitch is not None:
+        params["pitch"] = pitch
+    return STREETVIEW_BASE_URL + "?" + urlencode(params)
+
+
+def _fetch_url_bytes(street_view_url: str, cache_path: Path) -> bytes:
+    """Fetch a prebuilt Street View URL, serving from the disk cache when possible."""
+    # Serve identical requests from disk instead of re-hitting the paid API
+    if cache_path.exists():
+        return cache_path.read_bytes()
+
+    response = _session.get(street_view_url, timeout=10)
+
+    if response.status_code == 200:
+        img_bytes = response.content  # This is a bytes object
 
+        # Cache the raw JPEG (much smaller on disk than the decoded array)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_bytes(img_bytes)
 
-def fetch_streetview(lat: float, long: float, img_size: tuple, heading=None, pitch=None) -> np.ndarray:
+        print("Image fetched successfully")
+        return img_bytes
+
+    else:
+        print(f"Failed to fetch image. Status code: {response.status_code}")
+        return b""
+
+
+def _fetch_streetview_bytes(lat: float, long: float, img_size: tuple, heading=None, pitch=None) -> bytes:
     """
-    Fetches a Street View image from the Google Maps API for a specified location and returns it as a NumPy array.
+    Fetches a Street View image and returns the raw JPEG bytes.
 
     Args:
         lat (float): Latitude of the location.
@@ -22,118 +104,141 @@ def fetch_streetview(lat: float, long: float, img_size: tuple, heading=None, pit
         pitch (int, optional): The pitch angle of the camera (-90 to 90 degrees). Defaults to None.
 
     Returns:
-        np.ndarray: The fetched image as a NumPy array, or an empty array if the fetch fails.
-    
-    Raises:
-        requests.exceptions.RequestException: If the API request fails or the status code is not 200.
+        bytes: The JPEG-encoded image, or empty bytes if the fetch fails.
     """
     if img_size[0] > 640 or img_size[1] > 640:
         print("The maximum image size is 640 x 640")
-        return np.array([])
+        return b""
 
-    location = f"{lat}, {long}"
-    size = f"{img_size[0]}x{img_size[1]}"
-    
-    # Construct the URL based on available parameters
-    if heading and pitch:
-        street_view_url = (
-            f"https://maps.googleapis.com/maps/api/streetview"
-            f"?size={size}&location={location}&heading={heading}&pitch={pitch}&key={API_KEY}"
-        )
-    elif heading:
-        street_view_url = (
-            f"https://maps.googleapis.com/maps/api/streetview"
-            f"?size={size}&location={location}&heading={heading}&key={API_KEY}"
-        )
-    elif pitch:
-        street_view_url = (
-            f"https://maps.googleapis.com/maps/api/streetview"
-            f"?size={size}&location={location}&pitch={pitch}&key={API_KEY}"
-        )
-    else:
-        street_view_url = (
-            f"https://maps.googleapis.com/maps/api/streetview"
-            f"?size={size}&location={location}&key={API_KEY}"
-        )
+    return _fetch_url_bytes(
+        _build_streetview_url(lat, long, img_size, heading=heading, pitch=pitch),
+        _cache_path(lat, long, img_size, heading, pitch),
+    )
 
-    response = requests.get(street_view_url)
 
-    if response.status_code == 200:
-        img_bytes = response.content  # This is a bytes object
-        image_stream = BytesIO(img_bytes)
-        image_pil = Image.open(image_stream)
-        image = np.array(image_pil)
-        print("Image fetched successfully")
-        return image
+def fetch_streetview(lat: float, long: float, img_size: tuple, heading=None, pitch=None) -> np.ndarray:
+    """
+    Fetches a Street View image from the Google Maps API for a specified location and returns it as a NumPy array.
 
-    else:
-        print(f"Failed to fetch image. Status code: {response.status_code}")
+    Args:
+        lat (float): Latitude of the location.
+        long (float): Longitude of the location.
+        img_size (tuple): Tuple representing the image size (width, height) in pixels (max: 640x640).
+        heading (int, optional): The heading angle of the camera (0 to 360 degrees). Defaults to None.
+        pitch (int, optional): The pitch angle of the camera (-90 to 90 degrees). Defaults to None.
+
+    Returns:
+        np.ndarray: The fetched image as a NumPy array, or an empty array if the fetch fails.
+    """
+    img_bytes = _fetch_streetview_bytes(lat, long, img_size, heading=heading, pitch=pitch)
+    if not img_bytes:
         return np.array([])
+    return _decode_jpeg(img_bytes)
 
 
-def get_path_imgs(start: tuple, end: tuple, num_points=100) -> list:
+def get_path_imgs(start: tuple, end: tuple, num_points=100, decode=True):
     """
     Retrieves a series of Street View images along a route from the starting point to the destination.
 
     Args:
         start (tuple): A tuple representing the starting location (latitude, longitude).
         end (tuple): A tuple representing the destination location (latitude, longitude).
-        interval (int, optional): Interval for selecting points along the route. Default is 1 (every point).
+        num_points (int, optional): Number of points to sample along the route. Default is 100.
+        decode (bool, optional): If True, return decoded images; if False, return
+            the raw JPEG bytes and leave decoding to the consumer. Default is True.
 
     Returns:
-        list: A list of Street View images as NumPy arrays along the route.
-    
+        np.ndarray or list: With decode=True, a (num_points, 640, 640, 3) uint8
+            batch of images in route order (failed fetches stay zeroed); with
+            decode=False, a list of JPEG bytes.
+
     Raises:
         Exception: If the route directions cannot be fetched or processed.
     """
-    ROUTE_API_KEY = load_api_key()
-    path_imgs = []
-
-    # Define coordinates and initialize the client
+    # Define coordinates and get the shared client
     STARTING_LOCATION = [start[0], start[1]]  # [latitude, longitude]
     DESTINATION_LOCATION = [end[0], end[1]]  # [latitude, longitude]
     coords = [STARTING_LOCATION[::-1], DESTINATION_LOCATION[::-1]]  # [longitude, latitude]
-    client = openrouteservice.Client(key=ROUTE_API_KEY)
+    client = get_client()
 
     # Get directions
     directions_result = get_directions(client, coords)
 
-    # Extract the LineString and interpolate points
+    # Extract the LineString and interpolate points with their headings
     line = LineString(directions_result["features"][0]["geometry"]["coordinates"])
-    spaced_points = interpolate_points(line, num_points)
-
-    # Calculate headings for spaced points
-    spaced_points_heading = calculate_headings(spaced_points)
+    lon, lat, headings = interpolate_with_headings(line, num_points)
 
     # Save spaced points with headings as GeoJSON
-    heading_geojson = geojson.FeatureCollection([
-        geojson.Feature(
-            properties={"heading": hd["heading"]},
-            geometry=Point(hd["coordinates"])
-        ) for hd in spaced_points_heading
-    ])
-
+    heading_geojson = build_heading_geojson(lon, lat, headings)
     save_geojson(heading_geojson, "spaced_points_with_heading.geojson")
     # Create and save the map
     create_map(
         start_location=STARTING_LOCATION,
         end_location=DESTINATION_LOCATION,
         directions_result=directions_result,
-        spaced_points=spaced_points,
+        lon=lon,
+        lat=lat,
         output_file="route_with_interpolated_points.html"
     )
     # Save the original route as GeoJSON
     save_geojson(directions_result, "route.geojson")
 
     print("Fetching streetview...")
+
+    # Consecutive points on a straight segment often resolve to the same
+    # panorama; dedupe on (rounded location, 10-degree heading bucket) and
+    # fetch each unique key once, then map results back to route order
+    unique_features = []
+    key_to_index = {}
+    inverse = []
     for point in heading_geojson['features']:
+        coord = point['geometry']['coordinates']
+        heading = point['properties']['heading']
+        bucket = heading // 10 * 10 if heading is not None else None
+        key = (round(coord[1], 5), round(coord[0], 5), bucket)
+        if key not in key_to_index:
+            key_to_index[key] = len(unique_features)
+            unique_features.append(point)
+        inverse.append(key_to_index[key])
+
+    # Build every URL and cache path up front in one pass, so pool workers
+    # only perform I/O on ready-made requests
+    fetch_args = []
+    for point in unique_features:
         coord = point['geometry']['coordinates']  # This is long-lat
         heading = point['properties']['heading']  # 1 - 360
-
-        cur_pos_img = fetch_streetview(lat=coord[1], long=coord[0], img_size=(640, 640), heading=heading)
-        path_imgs.append(cur_pos_img)
-
-    return path_imgs
+        fetch_args.append((
+            _build_streetview_url(coord[1], coord[0], (640, 640), heading=heading),
+            _cache_path(coord[1], coord[0], (640, 640), heading, None),
+        ))
+
+    if not decode:
+        # Fetch concurrently; pool.map preserves order and dispatches the
+        # next request as soon as a worker frees up
+        with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as pool:
+            unique_imgs = list(pool.map(lambda args: _fetch_url_bytes(*args), fetch_args))
+        return [unique_imgs[i] for i in inverse]
+
+    # Decode straight into one preallocated contiguous batch, so consumers
+    # get a stackable tensor without an extra ~N x 1.2 MB copy. Each unique
+    # key owns a disjoint set of batch slices, so workers write lock-free.
+    batch = np.zeros((len(inverse), 640, 640, 3), dtype=np.uint8)
+    positions = [[] for _ in unique_features]
+    for i, unique_idx in enumerate(inverse):
+        positions[unique_idx].append(i)
+
+    def fetch_into_batch(unique_idx):
+        img_bytes = _fetch_url_bytes(*fetch_args[unique_idx])
+        if not img_bytes:
+            return
+        img = _decode_jpeg(img_bytes)
+        if img.shape == batch.shape[1:]:
+            batch[positions[unique_idx]] = img
+
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as pool:
+        list(pool.map(fetch_into_batch, range(len(unique_features))))
+
+    return batch
 
 
 if __name__ == "__main__":